@@ -0,0 +1,26 @@
+"""
+Throughput of the key generation, run from the repository root with :
+
+    python -m benchmarks.keys
+"""
+
+from timeit import timeit
+import random
+import string
+
+from ihaveasecret.keys import KeyGenerator
+
+
+def legacy_random_string(length: int = 32) -> str:
+    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+if __name__ == "__main__":
+    n = 200000
+    generator = KeyGenerator()
+    for name, fn in [
+        ("random.choices (legacy)", legacy_random_string),
+        ("KeyGenerator", generator.generate),
+    ]:
+        duration = timeit(fn, number=n)
+        print(f"{name:>24}: {n / duration:>12,.0f} keys/s")
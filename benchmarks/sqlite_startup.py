@@ -0,0 +1,41 @@
+"""
+Startup time of the SQLite store with a million secrets, half of them
+expired, run from the repository root with :
+
+    python -m benchmarks.sqlite_startup
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import sqlite3
+
+from ihaveasecret.secretstore import SQLiteSecretStore
+
+if __name__ == "__main__":
+    n = 1000000
+    with TemporaryDirectory() as tmpdir:
+        path = (Path(tmpdir) / "secrets.db").as_posix()
+        SQLiteSecretStore(path, "default password").close()
+        now = datetime.now()
+        expired = (now - timedelta(hours=1)).timestamp()
+        alive = (now + timedelta(hours=1)).timestamp()
+        with sqlite3.connect(path) as db:
+            db.executemany(
+                "INSERT INTO secrets (key, data, expires) VALUES (?, '{}', ?)",
+                ((f"key-{i}", expired if i % 2 else alive) for i in range(n)),
+            )
+
+        start = perf_counter()
+        store = SQLiteSecretStore(path, "default password")
+        opened = perf_counter()
+        store.save("key", "note", "message", now + timedelta(hours=1))
+        saved = perf_counter()
+        store.load("key")
+        loaded = perf_counter()
+        store.close()
+
+        print(f"{'open':>12}: {(opened - start) * 1000:8.1f} ms")
+        print(f"{'first save':>12}: {(saved - opened) * 1000:8.1f} ms")
+        print(f"{'first load':>12}: {(loaded - saved) * 1000:8.1f} ms")
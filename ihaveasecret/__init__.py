@@ -4,6 +4,7 @@ from .configuration import configurationStore
 from .routes import create_routes
 from .csrf_token import make_csrf_token
 from .util import to_data_uri
+from .tracing import start_request, server_timing_header, traced
 import logging
 import os
 from datetime import datetime
@@ -34,6 +35,7 @@ app.config["LANGUAGES"] = {
 }
 
 
+@traced("locale")
 def get_locale():
     return request.accept_languages.best_match(app.config["LANGUAGES"].keys()) or "en"
 
@@ -53,6 +55,13 @@ if not app_secret_key:
 app.secret_key = app_secret_key
 
 
+# ------------------------------------------------------------------------------
+# request tracing : measure the time spent in each phase of the request
+@app.before_request
+def start_request_timings():
+    start_request()
+
+
 # ------------------------------------------------------------------------------
 # response headers configuration
 @app.after_request
@@ -61,6 +70,9 @@ def add_security_headers(response):
     response.headers["X-Content-Type-Options"] = "nosniff"
     response.headers["X-Frame-Options"] = "DENY"
     response.headers["X-XSS-Protection"] = "1; mode=block"
+    server_timing = server_timing_header()
+    if server_timing:
+        response.headers["Server-Timing"] = server_timing
     return response
 
 
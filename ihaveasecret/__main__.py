@@ -1,6 +1,28 @@
 from . import app
+from . import admin
+from .secretstore import secretStore
+from .server import serve
+import argparse
 import logging
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ihaveasecret")
+    commands = parser.add_subparsers(dest="command")
+    admin.register_commands(commands)
+    commands.add_parser("serve", help="start the production server")
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO, force=True)
+        return serve(app, secretStore)
+    if args.command is None:
+        # no command : start the development server
+        logging.basicConfig(level=logging.DEBUG)
+        app.run(debug=True)
+        return 0
+    return args.func(args)
+
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.DEBUG)
-    app.run(debug=True)
+    sys.exit(main())
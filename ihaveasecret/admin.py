@@ -0,0 +1,297 @@
+"""
+Maintenance commands, available through `python -m ihaveasecret admin ...`
+
+All the commands stream the secrets by batches using SecretStore.scan(), so
+that the whole store is never loaded in memory, and the backend is never
+blocked for long.
+"""
+
+from datetime import datetime
+from hashlib import sha256
+from time import sleep
+import argparse
+import json
+import re
+from typing import Tuple
+
+from .secretstore import SecretStore, SecretInfo, secretStore
+
+# upper bounds (exclusive) of the histogram buckets
+ttl_buckets = [
+    ("expired", 0),
+    ("< 1 hour", 3600),
+    ("< 1 day", 86400),
+    ("< 1 week", 604800),
+    (">= 1 week", float("inf")),
+]
+
+size_buckets = [
+    ("< 1 KiB", 1024),
+    ("< 4 KiB", 4096),
+    ("< 16 KiB", 16384),
+    (">= 16 KiB", float("inf")),
+]
+
+# remove_many() binds one SQLite variable per key, and older SQLite versions
+# accept at most 999 of them in a statement
+max_batch_size = 999
+
+duration_regex = re.compile(r"^(\d+)([smhdw]?)$")
+duration_units = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(value: str) -> int:
+    """
+    Parse a duration such as '90', '30m', '12h' or '2d' into seconds.
+    """
+    match = duration_regex.match(value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid duration: {value}")
+    return int(match.group(1)) * duration_units[match.group(2)]
+
+
+def parse_batch_size(value: str) -> int:
+    try:
+        batch_size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid batch size: {value}")
+    if not 0 < batch_size <= max_batch_size:
+        raise argparse.ArgumentTypeError(
+            f"Batch size must be between 1 and {max_batch_size}"
+        )
+    return batch_size
+
+
+def bucket_of(value: float, buckets) -> str:
+    for name, upper_bound in buckets:
+        if value < upper_bound:
+            return name
+    return buckets[-1][0]
+
+
+def age_of(info: SecretInfo) -> int | None:
+    if info.created is None:
+        return None
+    return int((datetime.now() - info.created).total_seconds())
+
+
+def collect_stats(store: SecretStore, batch_size: int = 500) -> dict:
+    """
+    Compute counts, size and TTL histograms, and the password-protected ratio.
+    """
+    count = 0
+    total_size = 0
+    password_protected = 0
+    ttl_histogram = {name: 0 for name, _ in ttl_buckets}
+    size_histogram = {name: 0 for name, _ in size_buckets}
+    for batch in store.scan(batch_size):
+        for info in batch:
+            count += 1
+            total_size += info.size
+            password_protected += info.password_protected
+            ttl_histogram[bucket_of(info.ttl, ttl_buckets)] += 1
+            size_histogram[bucket_of(info.size, size_buckets)] += 1
+    return {
+        "count": count,
+        "total_size": total_size,
+        "password_protected_ratio": password_protected / count if count else 0.0,
+        "ttl_histogram": ttl_histogram,
+        "size_histogram": size_histogram,
+    }
+
+
+def matches(
+    info: SecretInfo,
+    older_than: int = None,
+    ttl_below: int = None,
+    ttl_above: int = None,
+) -> bool:
+    """
+    Tell if a secret matches all the given purge criteria.
+    """
+    if older_than is not None:
+        age = age_of(info)
+        if age is None or age < older_than:
+            return False
+    if ttl_below is not None and info.ttl >= ttl_below:
+        return False
+    if ttl_above is not None and info.ttl < ttl_above:
+        return False
+    return True
+
+
+def purge(
+    store: SecretStore,
+    older_than: int = None,
+    ttl_below: int = None,
+    ttl_above: int = None,
+    batch_size: int = 500,
+    pause: float = 0.0,
+    dry_run: bool = False,
+) -> Tuple[int, int]:
+    """
+    Remove the secrets matching the criteria, one batch at a time.
+    return the number of matching secrets, and the number of secrets skipped
+    because their age is unknown (they were stored before it was recorded)
+    """
+    purged = 0
+    unknown_age = 0
+    for batch in store.scan(batch_size):
+        keys = []
+        for info in batch:
+            if matches(info, older_than, ttl_below, ttl_above):
+                keys.append(info.key)
+            elif (
+                older_than is not None
+                and info.created is None
+                and matches(info, None, ttl_below, ttl_above)
+            ):
+                unknown_age += 1
+        if keys and not dry_run:
+            store.remove_many(keys)
+            # give some room to the live traffic between two batches
+            sleep(pause)
+        purged += len(keys)
+    return purged, unknown_age
+
+
+def fingerprint(key: str) -> str:
+    """
+    Keys grant access to the secrets, so they are never printed as is.
+    """
+    return sha256(key.encode()).hexdigest()[:16]
+
+
+def check_store() -> bool:
+    """
+    The in-memory store of this process is not the one of the server.
+    """
+    if not secretStore.shared:
+        print(
+            f"{type(secretStore).__name__} cannot be inspected from another "
+            "process, set redis.url or sqlite.path"
+        )
+        return False
+    return True
+
+
+def stats_command(args):
+    if not check_store():
+        return 1
+    stats = collect_stats(secretStore, args.batch_size)
+    if args.json:
+        print(json.dumps(stats))
+        return 0
+    print(f"secrets: {stats['count']}")
+    print(f"total size: {stats['total_size']} bytes")
+    print(f"password protected: {stats['password_protected_ratio']:.1%}")
+    print("ttl:")
+    for name, value in stats["ttl_histogram"].items():
+        print(f"  {name:>10}: {value}")
+    print("size:")
+    for name, value in stats["size_histogram"].items():
+        print(f"  {name:>10}: {value}")
+    return 0
+
+
+def purge_command(args):
+    if not check_store():
+        return 1
+    if (
+        args.older_than is None
+        and args.ttl_below is None
+        and args.ttl_above is None
+        and not args.all
+    ):
+        print("Refusing to purge without criteria, use --all to purge everything")
+        return 1
+    purged, unknown_age = purge(
+        secretStore,
+        older_than=args.older_than,
+        ttl_below=args.ttl_below,
+        ttl_above=args.ttl_above,
+        batch_size=args.batch_size,
+        pause=args.pause,
+        dry_run=args.dry_run,
+    )
+    print(f"{'would purge' if args.dry_run else 'purged'} {purged} secret(s)")
+    if unknown_age:
+        print(
+            f"skipped {unknown_age} secret(s) of unknown age, stored before their "
+            "creation time was recorded: use --ttl-below or --ttl-above for them"
+        )
+    return 0
+
+
+def audit_command(args):
+    if not check_store():
+        return 1
+    for batch in secretStore.scan(args.batch_size):
+        for info in batch:
+            print(
+                json.dumps(
+                    {
+                        "fingerprint": fingerprint(info.key),
+                        "size": info.size,
+                        "ttl": info.ttl,
+                        "age": age_of(info),
+                        "password_protected": info.password_protected,
+                    }
+                )
+            )
+    return 0
+
+
+def register_commands(commands):
+    """
+    Register the `admin` command into the given argparse subparsers.
+    """
+    admin = commands.add_parser("admin", help="maintenance commands")
+    admin.add_argument(
+        "--batch-size",
+        type=parse_batch_size,
+        default=500,
+        help=f"number of secrets fetched at once, at most {max_batch_size} "
+        "(default: 500)",
+    )
+    admin_commands = admin.add_subparsers(dest="admin_command", required=True)
+
+    stats_parser = admin_commands.add_parser(
+        "stats", help="count and size of the secrets"
+    )
+    stats_parser.add_argument("--json", action="store_true", help="output json")
+    stats_parser.set_defaults(func=stats_command)
+
+    purge_parser = admin_commands.add_parser("purge", help="remove secrets in bulk")
+    purge_parser.add_argument(
+        "--older-than",
+        type=parse_duration,
+        help="purge secrets created before this duration (e.g. 12h, 2d), "
+        "secrets stored without a creation time never match",
+    )
+    purge_parser.add_argument(
+        "--ttl-below",
+        type=parse_duration,
+        help="purge secrets expiring within this duration (e.g. 1h)",
+    )
+    purge_parser.add_argument(
+        "--ttl-above",
+        type=parse_duration,
+        help="purge secrets expiring after this duration (e.g. 1d)",
+    )
+    purge_parser.add_argument("--all", action="store_true", help="purge every secret")
+    purge_parser.add_argument(
+        "--pause",
+        type=float,
+        default=0.01,
+        help="seconds to wait between two batches (default: 0.01)",
+    )
+    purge_parser.add_argument(
+        "--dry-run", action="store_true", help="only count the matching secrets"
+    )
+    purge_parser.set_defaults(func=purge_command)
+
+    audit_parser = admin_commands.add_parser(
+        "audit", help="one json line per secret, with a fingerprint of its key"
+    )
+    audit_parser.set_defaults(func=audit_command)
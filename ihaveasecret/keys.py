@@ -0,0 +1,72 @@
+"""
+Generation of the keys identifying the secrets.
+
+Random bytes are drawn from the OS CSPRNG by large blocks, and encoded to
+URL-safe base64 in one pass, which fills a pool of ready-to-use keys.
+
+Version 1 keys look like `1<prefix>.<body>`, where the optional prefix
+(e.g. a shard or backend id) tells which store holds the secret, and the
+body holds 192 random bits. Keys without a version are legacy keys.
+"""
+
+from base64 import urlsafe_b64encode
+from typing import Tuple
+import os
+import re
+import threading
+
+from .configuration import configurationStore
+
+KEY_VERSION = "1"
+
+# 24 bytes encode to exactly 32 base64 characters, without padding
+KEY_BYTES = 24
+KEY_LENGTH = 32
+
+prefix_regex = re.compile(r"^[a-zA-Z0-9]*$")
+
+
+class KeyGenerator:
+
+    def __init__(self, prefix: str = "", pool_size: int = 256):
+        assert prefix_regex.match(prefix), "key prefix must be alphanumeric"
+        assert pool_size > 0, "pool_size must be greater than 0"
+        self.header = f"{KEY_VERSION}{prefix}."
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.pool = []
+
+    def _reset(self):
+        self.pool = []
+
+    def _refill(self):
+        encoded = urlsafe_b64encode(os.urandom(KEY_BYTES * self.pool_size)).decode()
+        self.pool = [
+            self.header + encoded[i : i + KEY_LENGTH]
+            for i in range(0, len(encoded), KEY_LENGTH)
+        ]
+
+    def generate(self) -> str:
+        with self.lock:
+            if not self.pool:
+                self._refill()
+            return self.pool.pop()
+
+
+def parse_key(key: str) -> Tuple[str | None, str, str]:
+    """
+    Split a key into its version, prefix and body.
+    The version is None for legacy keys.
+    """
+    head, sep, body = key.partition(".")
+    if sep and head.startswith(KEY_VERSION) and prefix_regex.match(head[1:]):
+        return KEY_VERSION, head[1:], body
+    return None, "", key
+
+
+keyGenerator = KeyGenerator(
+    configurationStore.get("keys.prefix", ""),
+    int(configurationStore.get("keys.pool_size", 256)),
+)
+# forked workers must not hand out the keys of their parent
+os.register_at_fork(after_in_child=keyGenerator._reset)
@@ -2,7 +2,7 @@ from flask import (
     Blueprint,
     request,
     session,
-    render_template,
+    render_template as flask_render_template,
     send_from_directory,
     redirect,
     url_for,
@@ -12,10 +12,14 @@ from datetime import datetime, timedelta
 from .configuration import configurationStore
 from .secretstore import secretStore
 from .send_email import send_message_created_email
-from .util import random_string, build_url, is_valid_email
+from .util import build_url, is_valid_email
+from .keys import keyGenerator
 from pathlib import Path
 from flask_babel import gettext, ngettext
 from .csrf_token import check_csrf_token
+from .tracing import traced
+
+render_template = traced("render")(flask_render_template)
 
 possible_ttls = [
     ("1 hour", gettext("1 hour"), timedelta(hours=1)),
@@ -79,7 +83,7 @@ def create_routes(url_prefix: str) -> Blueprint:
                     error=gettext("Invalid email address"),
                 )
 
-        key = random_string(32)
+        key = keyGenerator.generate()
 
         # save the secret
         secretStore.save(
@@ -5,6 +5,7 @@ import threading
 import logging
 from time import sleep
 import json
+import sqlite3
 
 from hashlib import sha256
 from Crypto.Cipher import AES
@@ -12,10 +13,11 @@ from Crypto.Util.Padding import pad, unpad
 from Crypto.Random import get_random_bytes
 
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Iterator, List, Tuple
 
 from .util import random_string
 from .configuration import configurationStore
+from .tracing import traced
 
 import redis
 
@@ -39,6 +41,7 @@ class CipheredMessage:
         )
 
     @staticmethod
+    @traced("crypto")
     def create_from_message(passphrase: str, message: str) -> "CipheredMessage":
         sha = sha256()
         sha.update(passphrase.encode())
@@ -48,6 +51,7 @@ class CipheredMessage:
         ciphertext = cipher.encrypt(pad(message.encode(), AES.block_size))
         return CipheredMessage(iv=iv, ciphertext=ciphertext)
 
+    @traced("crypto")
     def decrypt(self, passphrase: str) -> str:
         sha = sha256()
         sha.update(passphrase.encode())
@@ -64,6 +68,7 @@ class Secret:
     password_protected: bool = False
     password_hash: str = None
     password_attempts: int = 0
+    created: datetime = None
 
     def to_dict(self):
         return {
@@ -73,6 +78,7 @@ class Secret:
             "password_protected": self.password_protected,
             "password_hash": self.password_hash,
             "password_attempts": self.password_attempts,
+            "created": self.created.isoformat() if self.created else None,
         }
 
     @staticmethod
@@ -84,11 +90,40 @@ class Secret:
             password_protected=data["password_protected"],
             password_hash=data["password_hash"],
             password_attempts=data["password_attempts"],
+            created=(
+                datetime.fromisoformat(data["created"]) if data.get("created") else None
+            ),
+        )
+
+
+@dataclass
+class SecretInfo:
+    """
+    metadata about a stored secret, as reported by SecretStore.scan()
+    """
+
+    key: str
+    size: int
+    ttl: int
+    password_protected: bool
+    created: datetime | None = None
+
+    @staticmethod
+    def from_secret(key: str, secret: Secret, size: int) -> "SecretInfo":
+        return SecretInfo(
+            key=key,
+            size=size,
+            ttl=int((secret.expires - datetime.now()).total_seconds()),
+            password_protected=secret.password_protected,
+            created=secret.created,
         )
 
 
 class SecretStore(ABC):
 
+    # can the store be shared by several worker processes ?
+    shared = True
+
     def __init__(self, default_password: str = None, max_attempts: int = 3):
         assert max_attempts > 0, "max_attempts must be greater than 0"
         self.default_password = default_password or random_string(64)
@@ -112,6 +147,7 @@ class SecretStore(ABC):
             expires=expires,
             password_protected=password_protected,
             password_hash=sha256(password.encode()).hexdigest(),
+            created=datetime.now(),
         )
         self._store(key, secret)
 
@@ -156,6 +192,29 @@ class SecretStore(ABC):
             self._store(key, secret)
             return secret.note, False, remaining_attempts
 
+    def remove_many(self, keys: List[str]) -> None:
+        for key in keys:
+            self._remove(key)
+
+    def start(self) -> None:
+        """
+        start the background work of the store (called in each worker process)
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        stop the background work of the store, and release its resources
+        """
+        pass
+
+    @abstractmethod
+    def scan(self, batch_size: int = 500) -> Iterator[List[SecretInfo]]:
+        """
+        iterate over the stored secrets, yielding their metadata by batches
+        """
+        pass
+
     @abstractmethod
     def _store(self, key: str, secret: Secret) -> None:
         pass
@@ -171,18 +230,33 @@ class SecretStore(ABC):
 
 class InMemorySecretStore(SecretStore):
 
+    shared = False
+
     def __init__(self, default_password: str = None, max_attempts: int = 3):
         super().__init__(default_password, max_attempts)
         self.logger = logging.getLogger(__name__)
         self.secrets = {}
         self.max_attempts = max_attempts
-        self.cleanup_thread = threading.Thread(target=self._cleanup, daemon=True)
-        self.cleanup_thread.start()
-
-    def _cleanup(self):
-        while self.cleanup_thread is not None:
+        self.cleanup_thread = None
+        self.start()
+
+    def start(self) -> None:
+        if self.cleanup_thread is None:
+            self.stopped = threading.Event()
+            self.cleanup_thread = threading.Thread(
+                target=self._cleanup, args=(self.stopped,), daemon=True
+            )
+            self.cleanup_thread.start()
+
+    def close(self) -> None:
+        if self.cleanup_thread is not None:
+            self.stopped.set()
+            self.cleanup_thread.join()
+            self.cleanup_thread = None
+
+    def _cleanup(self, stopped: threading.Event):
+        while not stopped.wait(60):
             try:
-                sleep(60)
                 now = datetime.now()
                 for key, secret in list(self.secrets.items()):
                     if secret.expires < now:
@@ -190,19 +264,28 @@ class InMemorySecretStore(SecretStore):
             except Exception as e:
                 self.logger.error(f"Error in cleanup thread: {e}")
 
+    @traced("store")
     def _store(self, key: str, secret: Secret) -> None:
         self.secrets[key] = secret
 
+    @traced("store")
     def _load(self, key: str) -> Secret | None:
         return self.secrets.get(key)
 
+    @traced("store")
     def _remove(self, key: str) -> None:
         self.secrets.pop(key, None)
 
+    def scan(self, batch_size: int = 500) -> Iterator[List[SecretInfo]]:
+        items = list(self.secrets.items())
+        for i in range(0, len(items), batch_size):
+            yield [
+                SecretInfo.from_secret(key, secret, len(json.dumps(secret.to_dict())))
+                for key, secret in items[i : i + batch_size]
+            ]
+
     def __del__(self):
-        t = self.cleanup_thread
-        self.cleanup_thread = None
-        t.join()
+        self.close()
 
 
 class RedisSecretStore(SecretStore):
@@ -215,11 +298,13 @@ class RedisSecretStore(SecretStore):
         self.redis = redis.Redis.from_url(redis_url)
         self.max_attempts = max_attempts
 
+    @traced("store")
     def _store(self, key: str, secret: Secret) -> None:
         ex = int((secret.expires - datetime.now()).total_seconds())
         self.logger.debug(f"Storing secret {key} with expiration {secret.expires}")
         self.redis.set(f"ihaveasecret:{key}", json.dumps(secret.to_dict()), ex=ex)
 
+    @traced("store")
     def _load(self, key: str) -> Secret | None:
         data = self.redis.get(f"ihaveasecret:{key}")
         if data:
@@ -229,20 +314,301 @@ class RedisSecretStore(SecretStore):
             self.logger.debug(f"Secret {key} not found")
             return None
 
+    @traced("store")
     def _remove(self, key: str) -> None:
         self.logger.debug(f"Removing secret {key}")
         self.redis.delete(f"ihaveasecret:{key}")
 
+    def close(self) -> None:
+        self.redis.close()
+
+    @traced("store")
+    def remove_many(self, keys: List[str]) -> None:
+        # UNLINK frees the memory in the background, without blocking redis
+        pipeline = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.unlink(f"ihaveasecret:{key}")
+        pipeline.execute()
+
+    def scan(self, batch_size: int = 500) -> Iterator[List[SecretInfo]]:
+        cursor = 0
+        while True:
+            cursor, keys = self.redis.scan(
+                cursor, match="ihaveasecret:*", count=batch_size
+            )
+            if keys:
+                pipeline = self.redis.pipeline(transaction=False)
+                for key in keys:
+                    pipeline.memory_usage(key)
+                    pipeline.ttl(key)
+                    pipeline.get(key)
+                results = pipeline.execute()
+                batch = []
+                for i, key in enumerate(keys):
+                    size, ttl, data = results[3 * i : 3 * i + 3]
+                    if data is None:
+                        # removed since the SCAN call
+                        continue
+                    secret = Secret.from_dict(json.loads(data))
+                    batch.append(
+                        SecretInfo(
+                            key=key.decode().removeprefix("ihaveasecret:"),
+                            size=size or len(data),
+                            ttl=ttl,
+                            password_protected=secret.password_protected,
+                            created=secret.created,
+                        )
+                    )
+                yield batch
+            if cursor == 0:
+                break
+
+
+@dataclass
+class _Write:
+    """
+    write statement queued by SQLiteSecretStore
+    """
+
+    sql: str
+    params: tuple
+    done: bool = False
+    error: Exception | None = None
+    rowcount: int = 0
+
+
+class SQLiteSecretStore(SecretStore):
+    """
+    Durable single-node store, backed by a SQLite database in WAL mode.
+
+    Writes are group-committed : they are queued, and a background thread
+    runs them in a single BEGIN IMMEDIATE ... COMMIT transaction, so that
+    concurrent creates share the same fsync (synchronous=FULL, a write returns
+    only once it is on disk). The SQLite write lock is only held while the
+    batch runs, so several processes can share the database. Reads use their
+    own connection, and never wait for the writes.
+
+    Opening the database does not read its content, and expired secrets are
+    purged by small chunks, so startup time does not depend on the number of
+    stored secrets.
+    """
+
+    # maximum number of expired secrets deleted by a single write
+    cleanup_chunk_size = 1000
+
+    def __init__(
+        self,
+        path: str,
+        default_password: str = None,
+        max_attempts: int = 3,
+        commit_interval: float = 0.005,
+        busy_timeout: float = 5.0,
+    ):
+        super().__init__(default_password, max_attempts)
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.commit_interval = commit_interval
+        self.busy_timeout = busy_timeout
+        self.lock = threading.Condition()
+        self.read_lock = threading.Lock()
+        self.closed = True
+        self.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        db.execute("PRAGMA synchronous=FULL")
+        return db
+
+    def start(self) -> None:
+        if not self.closed:
+            return
+        self.closed = False
+        self.pending = []
+        self.write_db = self._connect()
+        self.write_db.execute("PRAGMA journal_mode=WAL")
+        self.write_db.execute(
+            "CREATE TABLE IF NOT EXISTS secrets ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.write_db.execute(
+            "CREATE INDEX IF NOT EXISTS secrets_expires ON secrets (expires)"
+        )
+        self.db = self._connect()
+        self.stopped = threading.Event()
+        self.commit_thread = threading.Thread(target=self._group_commit, daemon=True)
+        self.commit_thread.start()
+        self.cleanup_thread = threading.Thread(
+            target=self._cleanup, args=(self.stopped,), daemon=True
+        )
+        self.cleanup_thread.start()
+
+    def _write(self, sql: str, params: tuple) -> int:
+        """
+        queue a write statement, and wait for it to be committed
+        return the number of modified rows
+        """
+        write = _Write(sql, params)
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("SQLite secret store is closed")
+            self.pending.append(write)
+            self.lock.notify_all()
+            self.lock.wait_for(lambda: write.done)
+        if write.error:
+            raise write.error
+        return write.rowcount
+
+    def _group_commit(self):
+        while True:
+            with self.lock:
+                self.lock.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+            # let concurrent writers join the transaction
+            sleep(self.commit_interval)
+            with self.lock:
+                writes, self.pending = self.pending, []
+            self._commit(writes)
+            with self.lock:
+                for write in writes:
+                    write.done = True
+                self.lock.notify_all()
+
+    def _commit(self, writes: List[_Write]) -> None:
+        db = self.write_db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            for write in writes:
+                # a failing statement must not abort the other writes
+                db.execute("SAVEPOINT write")
+                try:
+                    write.rowcount = db.execute(write.sql, write.params).rowcount
+                except Exception as e:
+                    write.error = e
+                    if not db.in_transaction:
+                        # sqlite rolled back the whole transaction
+                        raise
+                    db.execute("ROLLBACK TO write")
+                db.execute("RELEASE write")
+            db.execute("COMMIT")
+        except Exception as e:
+            self.logger.error(f"Error while committing secrets: {e}")
+            for write in writes:
+                if write.error is None:
+                    write.error = RuntimeError(f"Could not commit the write: {e}")
+            try:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+            except Exception as e:
+                self.logger.error(f"Error while rolling back secrets: {e}")
+
+    def _cleanup(self, stopped: threading.Event):
+        while not stopped.is_set():
+            try:
+                # delete by chunks, so that the live writes are not delayed
+                while not stopped.is_set():
+                    deleted = self._write(
+                        "DELETE FROM secrets WHERE key IN ("
+                        "SELECT key FROM secrets WHERE expires < ? LIMIT ?)",
+                        (datetime.now().timestamp(), self.cleanup_chunk_size),
+                    )
+                    if deleted < self.cleanup_chunk_size:
+                        break
+            except Exception as e:
+                self.logger.error(f"Error in cleanup thread: {e}")
+            stopped.wait(60)
+
+    @traced("store")
+    def _store(self, key: str, secret: Secret) -> None:
+        self.logger.debug(f"Storing secret {key} with expiration {secret.expires}")
+        self._write(
+            "INSERT OR REPLACE INTO secrets (key, data, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(secret.to_dict()), secret.expires.timestamp()),
+        )
+
+    @traced("store")
+    def _load(self, key: str) -> Secret | None:
+        with self.read_lock:
+            row = self.db.execute(
+                "SELECT data FROM secrets WHERE key = ?", (key,)
+            ).fetchone()
+        if row:
+            self.logger.debug(f"Loaded secret {key}")
+            return Secret.from_dict(json.loads(row[0]))
+        else:
+            self.logger.debug(f"Secret {key} not found")
+            return None
+
+    @traced("store")
+    def _remove(self, key: str) -> None:
+        self.logger.debug(f"Removing secret {key}")
+        self._write("DELETE FROM secrets WHERE key = ?", (key,))
+
+    @traced("store")
+    def remove_many(self, keys: List[str]) -> None:
+        if keys:
+            self._write(
+                f"DELETE FROM secrets WHERE key IN ({', '.join('?' * len(keys))})",
+                tuple(keys),
+            )
+
+    def scan(self, batch_size: int = 500) -> Iterator[List[SecretInfo]]:
+        last_key = ""
+        while True:
+            # keyset pagination, so that the lock is only held for one batch
+            with self.read_lock:
+                rows = self.db.execute(
+                    "SELECT key, data FROM secrets WHERE key > ? ORDER BY key LIMIT ?",
+                    (last_key, batch_size),
+                ).fetchall()
+            if not rows:
+                break
+            yield [
+                SecretInfo.from_secret(
+                    key, Secret.from_dict(json.loads(data)), len(data)
+                )
+                for key, data in rows
+            ]
+            last_key = rows[-1][0]
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.stopped.set()
+        self.cleanup_thread.join()
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.commit_thread.join()
+        self.write_db.close()
+        self.db.close()
+
 
 redis_url = configurationStore.get("redis.url")
+sqlite_path = configurationStore.get("sqlite.path")
 max_attempts = int(configurationStore.get("passwords.max_attempts", 3))
 default_password = configurationStore.get("app.secret_key")
 
-if not redis_url:
+if redis_url:
+    secretStore = RedisSecretStore(redis_url, default_password, max_attempts)
+elif sqlite_path:
+    # a random default password would not decrypt the secrets after a restart
+    assert default_password, "app.secret_key must be set to use the SQLite store"
+    logging.info(f"Redis URL not set, using SQLite secret store at {sqlite_path}")
+    secretStore = SQLiteSecretStore(
+        sqlite_path,
+        default_password,
+        max_attempts,
+        commit_interval=int(configurationStore.get("sqlite.commit_interval_ms", 5))
+        / 1000,
+        busy_timeout=int(configurationStore.get("sqlite.busy_timeout_ms", 5000)) / 1000,
+    )
+else:
     logging.warning("Redis URL not set, using in-memory secret store")
-
-secretStore = (
-    InMemorySecretStore(default_password, max_attempts)
-    if redis_url is None
-    else RedisSecretStore(redis_url, default_password, max_attempts)
-)
+    secretStore = InMemorySecretStore(default_password, max_attempts)
@@ -7,6 +7,7 @@ from email.mime.base import MIMEBase
 from jinja2 import Environment, PackageLoader
 from bs4 import BeautifulSoup
 from .util import to_data_uri
+from .tracing import traced
 
 
 template_env = Environment(
@@ -14,6 +15,7 @@ template_env = Environment(
 )
 
 
+@traced("email")
 def send_message_created_email(recipient: str, message_url: str, note: str = None):
     """
     Send an email to the recipient with the message created.
@@ -0,0 +1,186 @@
+"""
+Production server, available through `python -m ihaveasecret serve`
+
+The application is loaded once, then served by one or more worker processes
+sharing the same listening socket. Each worker runs a waitress server, and
+drains its in-flight requests when it receives SIGTERM.
+"""
+
+from time import monotonic
+import logging
+import os
+import signal
+import socket
+
+from waitress import wasyncore
+from waitress.server import create_server
+
+from .configuration import configurationStore
+from .secretstore import SecretStore
+
+logger = logging.getLogger(__name__)
+
+stop_signals = {signal.SIGTERM, signal.SIGINT}
+
+
+def get_settings() -> dict:
+    return {
+        "host": configurationStore.get("server.host", "0.0.0.0"),
+        "port": int(configurationStore.get("server.port", 5000)),
+        "workers": int(configurationStore.get("server.workers", 1)),
+        "threads": int(configurationStore.get("server.threads", 4)),
+        "connection_limit": int(configurationStore.get("server.connection_limit", 100)),
+        "backlog": int(configurationStore.get("server.backlog", 1024)),
+        "channel_timeout": int(configurationStore.get("server.channel_timeout", 120)),
+        "drain_timeout": int(configurationStore.get("server.drain_timeout", 30)),
+    }
+
+
+def run_worker(app, sock: socket.socket, settings: dict) -> None:
+    """
+    Serve the requests until SIGTERM or SIGINT, then let the in-flight
+    requests complete before returning.
+    """
+    server = create_server(
+        app,
+        sockets=[sock],
+        threads=settings["threads"],
+        connection_limit=settings["connection_limit"],
+        backlog=settings["backlog"],
+        channel_timeout=settings["channel_timeout"],
+    )
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    adj = server.adj
+    while not stopping:
+        wasyncore.loop(
+            timeout=adj.asyncore_loop_timeout,
+            map=server._map,
+            use_poll=adj.asyncore_use_poll,
+            count=1,
+        )
+
+    # stop accepting new connections, but keep the trigger used by the
+    # task threads to wake up the loop
+    logger.info(
+        f"Worker {os.getpid()} draining {len(server.active_channels)} connection(s)"
+    )
+    wasyncore.dispatcher.close(server)
+    deadline = monotonic() + settings["drain_timeout"]
+    while server.active_channels and monotonic() < deadline:
+        for channel in list(server.active_channels.values()):
+            if not channel.requests and channel.request is None:
+                # idle keep-alive connection
+                channel.close_when_flushed = True
+        wasyncore.loop(
+            timeout=0.1,
+            map=server._map,
+            use_poll=adj.asyncore_use_poll,
+            count=1,
+        )
+    if server.active_channels:
+        logger.warning(
+            f"Worker {os.getpid()} dropping {len(server.active_channels)} connection(s)"
+        )
+    server.task_dispatcher.shutdown()
+    server.trigger.close()
+
+
+def spawn_worker(app, store: SecretStore, sock: socket.socket, settings: dict) -> int:
+    """
+    Fork a worker process. Must be called with the stop signals blocked, so
+    that the worker never runs the signal handlers of the master.
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+    # in the worker process
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+    exit_code = 0
+    try:
+        store.start()
+        run_worker(app, sock, settings)
+        store.close()
+    except Exception:
+        logger.exception(f"Worker {os.getpid()} failed")
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def serve(app, store: SecretStore) -> int:
+    settings = get_settings()
+    workers = settings["workers"]
+    if workers > 1 and not store.shared:
+        logger.error(
+            f"{type(store).__name__} cannot be shared by several worker processes"
+        )
+        return 1
+
+    sock = socket.create_server(
+        (settings["host"], settings["port"]), backlog=settings["backlog"]
+    )
+    logger.info(
+        f"Serving on http://{settings['host']}:{settings['port']} "
+        f"with {workers} worker(s) of {settings['threads']} thread(s)"
+    )
+
+    if workers <= 1:
+        try:
+            run_worker(app, sock, settings)
+        finally:
+            sock.close()
+            store.close()
+        return 0
+
+    # the workers open their own connections and threads
+    store.close()
+    # pid of the workers -> start time
+    children = {}
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in list(children):
+            os.kill(pid, signal.SIGTERM)
+
+    def spawn():
+        # a stop signal is only handled once the new worker is in children
+        signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+        try:
+            if not stopping:
+                children[spawn_worker(app, store, sock, settings)] = monotonic()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        spawn()
+
+    exit_code = 0
+    while children:
+        pid, status = os.wait()
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        if monotonic() - started < 1:
+            # do not restart workers that fail at startup in a loop
+            logger.error(f"Worker {pid} failed at startup, stopping")
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+        else:
+            logger.warning(f"Worker {pid} exited unexpectedly, restarting it")
+            spawn()
+
+    sock.close()
+    return exit_code
@@ -0,0 +1,89 @@
+"""
+Lightweight timing of the phases of a request (store, crypto, render, ...).
+
+Nothing is measured unless one of these settings is enabled :
+    - tracing.server_timing : the durations are summed per phase and sent
+      back in a Server-Timing response header
+    - tracing.opentelemetry : each phase is exported as an OpenTelemetry span
+      (requires the opentelemetry-api package, configured by the deployment)
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+import logging
+
+from .configuration import configurationStore
+
+# durations of the phases of the current request, in seconds
+_timings: ContextVar[dict | None] = ContextVar("timings", default=None)
+_request_start: ContextVar[float] = ContextVar("request_start", default=0.0)
+
+server_timing_enabled = bool(configurationStore.get("tracing.server_timing", False))
+
+tracer = None
+if bool(configurationStore.get("tracing.opentelemetry", False)):
+    try:
+        from opentelemetry import trace
+
+        tracer = trace.get_tracer("ihaveasecret")
+    except ImportError:
+        logging.warning("opentelemetry is not installed, tracing is disabled")
+
+
+def start_request():
+    """
+    start collecting the timings of the current request
+    """
+    if server_timing_enabled:
+        _timings.set({})
+        _request_start.set(perf_counter())
+
+
+@contextmanager
+def span(name: str):
+    timings = _timings.get()
+    if timings is None and tracer is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        if tracer is None:
+            yield
+        else:
+            with tracer.start_as_current_span(name):
+                yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + perf_counter() - start
+
+
+def traced(name: str):
+    """
+    decorator that runs the function in a span
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def server_timing_header() -> str | None:
+    """
+    build the Server-Timing header value for the current request, if enabled
+    """
+    timings = _timings.get()
+    if timings is None:
+        return None
+    _timings.set(None)
+    timings["total"] = perf_counter() - _request_start.get()
+    return ", ".join(
+        f"{name};dur={duration * 1000:.2f}" for name, duration in timings.items()
+    )
@@ -1,11 +1,12 @@
-import random
+import secrets
 import string
 from pathlib import Path
 import re
 
 
 def random_string(length: int) -> str:
-    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+    alphabet = string.ascii_letters + string.digits
+    return "".join(secrets.choice(alphabet) for _ in range(length))
 
 
 def build_url(*parts) -> str:
@@ -0,0 +1,188 @@
+from argparse import ArgumentTypeError, Namespace
+from datetime import datetime, timedelta
+import json
+import pytest
+from ihaveasecret import admin
+from ihaveasecret.admin import (
+    audit_command,
+    collect_stats,
+    fingerprint,
+    parse_batch_size,
+    parse_duration,
+    purge,
+    stats_command,
+)
+from ihaveasecret.secretstore import RedisSecretStore, SQLiteSecretStore
+
+
+def make_store(tmp_path):
+    store = SQLiteSecretStore((tmp_path / "secrets.db").as_posix(), "default password")
+    now = datetime.now()
+    store.save("a", "", "short lived", now + timedelta(minutes=30))
+    store.save("b", "", "long lived", now + timedelta(days=2), password="password")
+    store.save("c", "", "long lived", now + timedelta(days=2))
+    return store
+
+
+def test_parse_duration():
+    assert parse_duration("90") == 90
+    assert parse_duration("30m") == 1800
+    assert parse_duration("2d") == 172800
+
+
+def test_parse_batch_size():
+    assert parse_batch_size("500") == 500
+    for value in ["0", "-1", "1000", "abc"]:
+        with pytest.raises(ArgumentTypeError):
+            parse_batch_size(value)
+
+
+def test_collect_stats(tmp_path):
+    store = make_store(tmp_path)
+    stats = collect_stats(store, batch_size=2)
+    assert stats["count"] == 3
+    assert stats["total_size"] > 0
+    assert stats["password_protected_ratio"] == 1 / 3
+    assert stats["ttl_histogram"]["< 1 hour"] == 1
+    assert stats["ttl_histogram"]["< 1 week"] == 2
+    store.close()
+
+
+def test_purge_by_ttl(tmp_path):
+    store = make_store(tmp_path)
+    assert purge(store, ttl_below=3600, dry_run=True) == (1, 0)
+    assert purge(store, ttl_below=3600, batch_size=2) == (1, 0)
+    assert store.load("a") is None
+    assert collect_stats(store)["count"] == 2
+    assert purge(store, older_than=3600) == (0, 0)
+    store.close()
+
+
+def test_purge_by_age(tmp_path):
+    store = make_store(tmp_path)
+    secret = store._load("b")
+    secret.created -= timedelta(days=3)
+    store._store("b", secret)
+    assert purge(store, older_than=parse_duration("2d")) == (1, 0)
+    assert store.load("b") is None
+    assert collect_stats(store)["count"] == 2
+    store.close()
+
+
+def test_purge_by_age_reports_unknown_ages(tmp_path, monkeypatch, capsys):
+    store = make_store(tmp_path)
+    # secrets stored before their creation time was recorded
+    for key in ["a", "c"]:
+        secret = store._load(key)
+        secret.created = None
+        store._store(key, secret)
+    assert purge(store, older_than=0, dry_run=True) == (1, 2)
+    assert purge(store, older_than=0, ttl_below=3600, dry_run=True) == (0, 1)
+
+    monkeypatch.setattr(admin, "secretStore", store)
+    args = Namespace(
+        older_than=0,
+        ttl_below=None,
+        ttl_above=None,
+        all=False,
+        batch_size=500,
+        pause=0.0,
+        dry_run=False,
+    )
+    assert admin.purge_command(args) == 0
+    output = capsys.readouterr().out
+    assert "purged 1 secret(s)" in output
+    assert "skipped 2 secret(s) of unknown age" in output
+    assert collect_stats(store)["count"] == 2
+    store.close()
+
+
+def test_audit(tmp_path, monkeypatch, capsys):
+    store = make_store(tmp_path)
+    monkeypatch.setattr(admin, "secretStore", store)
+    assert audit_command(Namespace(batch_size=2)) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["fingerprint"] for line in lines] == [
+        fingerprint(key) for key in ["a", "b", "c"]
+    ]
+    assert [line["password_protected"] for line in lines] == [False, True, False]
+    assert all(line["age"] == 0 for line in lines)
+    store.close()
+
+
+def test_refuse_in_memory_store(capsys):
+    # no redis.url nor sqlite.path in the tests : the store is in memory
+    assert stats_command(Namespace(batch_size=500, json=False)) == 1
+    assert "InMemorySecretStore" in capsys.readouterr().out
+
+
+def as_bytes(key):
+    return key.encode() if isinstance(key, str) else key
+
+
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def memory_usage(self, key):
+        key = as_bytes(key)
+        self.commands.append(lambda: 100 if key in self.redis.data else None)
+
+    def ttl(self, key):
+        key = as_bytes(key)
+        self.commands.append(lambda: 3000 if key in self.redis.data else -2)
+
+    def get(self, key):
+        key = as_bytes(key)
+        self.commands.append(lambda: self.redis.data.get(key))
+
+    def unlink(self, key):
+        key = as_bytes(key)
+        self.commands.append(lambda: self.redis.data.pop(key, None) and 1)
+
+    def execute(self):
+        return [command() for command in self.commands]
+
+
+class FakeRedis:
+    """
+    in-memory redis, scanning its keys two by two
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, ex=None):
+        self.data[as_bytes(key)] = as_bytes(value)
+
+    def scan(self, cursor, match=None, count=None):
+        # a deleted key may still be returned by SCAN
+        keys = sorted(self.data) + [b"ihaveasecret:deleted"]
+        next_cursor = cursor + 2 if cursor + 2 < len(keys) else 0
+        return next_cursor, keys[cursor : cursor + 2]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def test_redis_scan():
+    store = RedisSecretStore("redis://localhost:6379/0", "default password")
+    store.redis = FakeRedis()
+    now = datetime.now()
+    store.save("a", "", "short lived", now + timedelta(minutes=30))
+    store.save("b", "", "long lived", now + timedelta(days=2), password="password")
+    store.save("c", "", "long lived", now + timedelta(days=2))
+
+    infos = [info for batch in store.scan(batch_size=2) for info in batch]
+    assert [info.key for info in infos] == ["a", "b", "c"]
+    assert [info.password_protected for info in infos] == [False, True, False]
+    assert all(info.size == 100 and info.ttl == 3000 for info in infos)
+    assert all(info.created is not None for info in infos)
+
+    assert purge(store, ttl_above=3600) == (0, 0)
+    store.remove_many(["a", "b"])
+    assert list(store.redis.data) == [b"ihaveasecret:c"]
+    assert purge(store, ttl_below=3600) == (1, 0)
+    assert store.redis.data == {}
@@ -0,0 +1,53 @@
+from string import ascii_letters, digits
+from ihaveasecret.keys import KeyGenerator, keyGenerator, parse_key
+import os
+
+alphabet = ascii_letters + digits + "-_"
+
+
+def test_key_format():
+    key = KeyGenerator().generate()
+    assert parse_key(key) == ("1", "", key[2:])
+    assert len(key[2:]) == 32
+
+    key = KeyGenerator(prefix="eu1").generate()
+    version, prefix, body = parse_key(key)
+    assert (version, prefix) == ("1", "eu1")
+    assert len(body) == 32 and all(c in alphabet for c in body)
+
+
+def test_legacy_key():
+    assert parse_key("aBcD1234") == (None, "", "aBcD1234")
+
+
+def test_keys_are_unique():
+    generator = KeyGenerator(pool_size=16)
+    keys = [generator.generate() for _ in range(1000)]
+    assert len(set(keys)) == len(keys)
+
+
+def test_keys_are_uniformly_distributed():
+    generator = KeyGenerator()
+    counts = dict.fromkeys(alphabet, 0)
+    n = 20000
+    for _ in range(n):
+        for c in parse_key(generator.generate())[2]:
+            counts[c] += 1
+    expected = n * 32 / len(alphabet)
+    chi2 = sum((count - expected) ** 2 / expected for count in counts.values())
+    # 63 degrees of freedom : the probability of exceeding 130 is below 1e-6
+    assert chi2 < 130
+
+
+def test_forked_process_does_not_reuse_keys():
+    parent_key = keyGenerator.generate()
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(w, keyGenerator.generate().encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    child_key = os.read(r, 1024).decode()
+    # without the reset, the child would get the next key of the parent pool
+    assert child_key != keyGenerator.generate()
+    assert child_key != parent_key
@@ -1,13 +1,171 @@
-from ihaveasecret.secretstore import CipheredMessage
+from datetime import datetime, timedelta
+from time import monotonic, sleep
+import os
+import sqlite3
+import threading
+import pytest
+from ihaveasecret.secretstore import CipheredMessage, SQLiteSecretStore
+
 
 def test_ciphered_message():
     message = CipheredMessage.create_from_message("password", "this is a test")
     assert message.decrypt("password") == "this is a test"
 
+
 def test_wrong_password():
     try:
         message = CipheredMessage.create_from_message("password", "this is a test")
         message.decrypt("wrong password")
         assert False, "Exception not raised"
     except ValueError as e:
-        pass
\ No newline at end of file
+        pass
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = (tmp_path / "secrets.db").as_posix()
+    store = SQLiteSecretStore(path, "default password")
+    store.save("key", "note", "this is a test", datetime.now() + timedelta(hours=1))
+    store.close()
+
+    store = SQLiteSecretStore(path, "default password")
+    secret = store.load("key")
+    assert secret.note == "note"
+    assert secret.message.decrypt("default password") == "this is a test"
+    assert store.load("key") is None
+    store.close()
+
+
+def test_sqlite_store_restart_hooks(tmp_path):
+    store = SQLiteSecretStore((tmp_path / "secrets.db").as_posix(), "default password")
+    store.close()
+    store.close()
+    store.start()
+    store.save("key", "note", "this is a test", datetime.now() + timedelta(hours=1))
+    assert store.load("key").note == "note"
+    store.close()
+
+
+def test_sqlite_store_recovers_from_failing_write(tmp_path):
+    store = SQLiteSecretStore((tmp_path / "secrets.db").as_posix(), "default password")
+    with pytest.raises(sqlite3.OperationalError):
+        store._write("INSERT INTO missing_table VALUES (?)", (1,))
+    store.save("key", "note", "this is a test", datetime.now() + timedelta(hours=1))
+    assert store.load("key").note == "note"
+    store.close()
+
+
+class FailingCommit:
+    """
+    wraps a sqlite connection, and fails its next COMMIT
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.fail = True
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT" and self.fail:
+            self.fail = False
+            raise sqlite3.OperationalError("disk I/O error")
+        return self.db.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+def test_sqlite_store_reports_failing_commit(tmp_path):
+    store = SQLiteSecretStore((tmp_path / "secrets.db").as_posix(), "default password")
+    # stop the cleanup thread, so that only our write hits the failing commit
+    store.stopped.set()
+    store.cleanup_thread.join()
+    store.write_db = FailingCommit(store.write_db)
+    expires = datetime.now() + timedelta(hours=1)
+    with pytest.raises(RuntimeError):
+        store.save("key", "note", "this is a test", expires)
+    assert store.load("key") is None
+    store.save("key", "note", "this is a test", expires)
+    assert store.load("key").note == "note"
+    store.close()
+
+
+def test_sqlite_failing_write_does_not_hide_other_writes(tmp_path):
+    path = (tmp_path / "secrets.db").as_posix()
+    store_a = SQLiteSecretStore(path, "default password")
+    store_b = SQLiteSecretStore(path, "default password")
+    expires = datetime.now() + timedelta(hours=1)
+    store_a.save("first", "note", "this is a test", expires)
+    # the statement reads the table, then fails on a constraint
+    with pytest.raises(sqlite3.IntegrityError):
+        store_a._write("UPDATE secrets SET data = NULL WHERE key = ?", ("first",))
+    store_b.save("key", "note", "this is a test", expires)
+    assert store_a.load("key", remove=False).note == "note"
+    store_a.close()
+    store_b.close()
+
+
+def test_sqlite_store_shared_by_processes(tmp_path):
+    path = (tmp_path / "secrets.db").as_posix()
+    SQLiteSecretStore(path, "default password").close()
+
+    def work(store, prefix):
+        expires = datetime.now() + timedelta(hours=1)
+        for i in range(200):
+            key = f"{prefix}-{i}"
+            store.save(key, "note", "this is a test", expires)
+            assert store.load(key).note == "note"
+
+    pids = []
+    for process in range(4):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                store = SQLiteSecretStore(path, "default password")
+                errors = []
+
+                def run(prefix):
+                    try:
+                        work(store, prefix)
+                    except BaseException as e:
+                        errors.append(e)
+
+                threads = [
+                    threading.Thread(target=run, args=(f"{process}-{thread}",))
+                    for thread in range(8)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                store.close()
+                exit_code = 1 if errors else 0
+            finally:
+                os._exit(exit_code)
+        pids.append(pid)
+
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_sqlite_store_purges_expired_secrets_by_chunks(tmp_path, monkeypatch):
+    path = (tmp_path / "secrets.db").as_posix()
+    SQLiteSecretStore(path, "default password").close()
+    expired = (datetime.now() - timedelta(hours=1)).timestamp()
+    with sqlite3.connect(path) as db:
+        db.executemany(
+            "INSERT INTO secrets (key, data, expires) VALUES (?, '{}', ?)",
+            ((f"expired-{i}", expired) for i in range(2500)),
+        )
+    monkeypatch.setattr(SQLiteSecretStore, "cleanup_chunk_size", 1000)
+    store = SQLiteSecretStore(path, "default password")
+    store.save("key", "note", "this is a test", datetime.now() + timedelta(hours=1))
+    deadline = monotonic() + 5
+    while monotonic() < deadline:
+        count = store.db.execute("SELECT COUNT(*) FROM secrets").fetchone()[0]
+        if count == 1:
+            break
+        sleep(0.05)
+    assert count == 1
+    assert store.load("key").note == "note"
+    store.close()
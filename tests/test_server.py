@@ -0,0 +1,96 @@
+from time import monotonic, sleep
+from urllib.request import urlopen
+import os
+import signal
+import socket
+import threading
+from ihaveasecret import server
+from ihaveasecret.secretstore import InMemorySecretStore, SQLiteSecretStore
+
+settings = {
+    "host": "127.0.0.1",
+    "port": 0,
+    "workers": 1,
+    "threads": 4,
+    "connection_limit": 100,
+    "backlog": 128,
+    "channel_timeout": 120,
+    "drain_timeout": 10,
+}
+
+
+def test_drain_in_flight_request():
+    started_r, started_w = os.pipe()
+
+    def slow_app(environ, start_response):
+        os.write(started_w, b"x")
+        sleep(1)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"done"]
+
+    sock = socket.create_server(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            server.run_worker(slow_app, sock, settings)
+        except BaseException:
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    sock.close()
+
+    responses = []
+
+    def client():
+        responses.append(urlopen(f"http://127.0.0.1:{port}/", timeout=10).read())
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    # send SIGTERM while the request is being processed
+    os.read(started_r, 1)
+    os.kill(pid, signal.SIGTERM)
+    thread.join()
+    _, status = os.waitpid(pid, 0)
+    assert responses == [b"done"]
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_refuse_workers_with_in_memory_store(monkeypatch):
+    monkeypatch.setattr(server, "get_settings", lambda: dict(settings, workers=2))
+    store = InMemorySecretStore()
+    assert server.serve(None, store) == 1
+    store.close()
+
+
+def hello_app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"hello"]
+
+
+def test_stop_while_spawning_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "get_settings", lambda: dict(settings, workers=4))
+    for delay in [0.0, 0.005, 0.02, 0.1]:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                store = SQLiteSecretStore(
+                    (tmp_path / "secrets.db").as_posix(), "default password"
+                )
+                exit_code = server.serve(hello_app, store)
+            finally:
+                os._exit(exit_code)
+        sleep(delay)
+        os.kill(pid, signal.SIGTERM)
+        # the master must not wait forever for workers that were never stopped
+        deadline = monotonic() + 10
+        while monotonic() < deadline:
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                break
+            sleep(0.05)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            assert False, f"master still running after SIGTERM at {delay}s"
@@ -0,0 +1,19 @@
+from ihaveasecret import app, tracing
+
+
+def test_no_header_by_default():
+    response = app.test_client().get("/create")
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+def test_server_timing_header(monkeypatch):
+    monkeypatch.setattr(tracing, "server_timing_enabled", True)
+    response = app.test_client().get("/create")
+    assert response.status_code == 200
+    phases = [
+        entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")
+    ]
+    assert "render" in phases
+    assert "locale" in phases
+    assert "total" in phases